@@ -1,10 +1,55 @@
 from flask import Flask, request, jsonify, render_template
+from flask.json.provider import DefaultJSONProvider
 import math
+import os
+from functools import lru_cache
 from flask_cors import CORS
 
+try:
+    import orjson
+except ImportError:  # fall back to Flask's stdlib json provider
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson, used for jsonify and request.get_json.
+
+    Unlike the stdlib provider, orjson writes NaN and Infinity as null. Request
+    parsing rejects non-finite inputs, so responses only differ for inputs large
+    enough to overflow the calculation.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._dumps_bytes(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            # orjson rejects the NaN/Infinity literals the stdlib parser accepts
+            return super().loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = self._dumps_bytes(obj, orjson.OPT_INDENT_2 if indent else 0)
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+    def _dumps_bytes(self, obj, option=0):
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option)
+
+
 app = Flask(__name__)
+if orjson is not None:
+    app.json = OrjsonProvider(app)
 CORS(app, resources={
-    r"/calculate": {
+    r"/calculate(_batch)?": {
         "origins": ["http://localhost:5173", "http://127.0.0.1:5173"],
         "methods": ["POST", "OPTIONS"],
         "allow_headers": ["Content-Type"],
@@ -87,66 +132,350 @@ ESKOM_RATE = (STANDARD_ESKOM_RATE * 0.9) + (PREMIUM_ESKOM_RATE * 0.1)
 CO2_GRID = 0.9   # 0.9 kg CO2 per kWh for grid electricity
 CO2_SOLAR = 0.09  # 0.09 kg CO2 per kWh for solar (not zero)
 
+# Zero-valued response body returned alongside an "error" message
+_ERROR_TEMPLATE = {
+    "presentValueEbucks": 0,
+    "carbonTaxSavings": 0,
+    "fuelSpendSavings": 0,
+    "upfrontSavings": 0,
+    "totalSavings": 0,
+    "standardUpfrontBenefits": {
+        "presentValueEbucks": 0,
+        "carbonTaxSavings": 0,
+        "upfrontSavings": 0
+    },
+    "co2Emissions": {
+        "ice": 0,
+        "ev": 0,
+        "monthlySavings": 0,
+        "yearlySavings": 0
+    }
+}
+
 ###############################################################################
 # Helper Functions
 ###############################################################################
 def present_value_of_growing_annuity(cash_flow, growth_rate, discount_rate, periods):
     """Calculates the present value of a growing annuity."""
+    return _growing_annuity_pv(cash_flow, growth_rate, discount_rate, periods,
+                               (1 + growth_rate) ** periods, (1 + discount_rate) ** periods)
+
+def _growing_annuity_pv(cash_flow, growth_rate, discount_rate, periods, growth_pow, discount_pow):
+    """Growing annuity PV given growth_pow = (1+g)**periods and discount_pow = (1+r)**periods."""
     if abs(growth_rate - discount_rate) < 1e-9:
-        return cash_flow * periods / ((1 + discount_rate) ** periods)
+        return cash_flow * periods / discount_pow
     else:
-        return cash_flow * (((1 + growth_rate) ** periods - (1 + discount_rate) ** periods) / (growth_rate - discount_rate)) / ((1 + discount_rate) ** periods)
+        return cash_flow * ((discount_pow - growth_pow) / (discount_rate - growth_rate)) / discount_pow
 
-def present_value(cash_flow, discount_rate, year_index):
-    """Discount a single cash flow from a future year to present value."""
-    return cash_flow / ((1 + discount_rate) ** year_index)
+def present_value_of_annuity(cash_flow, discount_rate, periods):
+    """Calculates the present value of a level (non-growing) ordinary annuity."""
+    if abs(discount_rate) < 1e-9:
+        return cash_flow * periods
+    return cash_flow * (1 - (1 + discount_rate) ** -periods) / discount_rate
 
-def calculate_monthly_co2(distance, fuel_type):
-    """Calculate monthly CO2 emissions for a given distance and fuel type."""
-    consumption_rate = FUEL_CONSUMPTION.get(fuel_type, 9.0)
-    monthly_litres = (consumption_rate * distance) / 100.0
-    monthly_co2 = monthly_litres * CO2_PER_LITRE
-    return monthly_co2
+###############################################################################
+# Precomputed Factors
+###############################################################################
+# (fuel price, consumption) per fuel type, so each request needs a single lookup
+_FUEL_PARAMS = {fuel_type: (FUEL_PRICES[fuel_type], FUEL_CONSUMPTION[fuel_type]) for fuel_type in FUEL_PRICES}
+_DEFAULT_FUEL_PARAMS = (21.62, 9.0)
+
+# Powers of (1 + rate) for whole-year terms up to 32 years
+_DISC_POW = tuple((1 + DISCOUNT_RATE) ** i for i in range(33))
+_INFL_POW = tuple((1 + FUEL_INFLATION) ** i for i in range(33))
+
+# PV of 5 years of carbon tax per tonne of CO₂ (2025 onwards), so per-request
+# carbon tax savings reduce to annual tonnes * factor
+_PV_CARBON_FACTOR = sum(
+    CARBON_TAX.get(2025 + i, CARBON_TAX[max(CARBON_TAX.keys())]) / _DISC_POW[i+1]
+    for i in range(5)  # Always 5 years for carbon tax savings
+)
+
+# PV of carbon tax per monthly litre of fuel (12 months of CO2 in tonnes)
+_CARBON_TAX_PV_PER_MONTHLY_LITRE = 12 * CO2_PER_LITRE / 1000.0 * _PV_CARBON_FACTOR
+
+# PV of R1 of year-1 eBucks growing with fuel inflation over 5 years
+_EBUCKS_PV_FACTOR_5Y = present_value_of_growing_annuity(1.0, FUEL_INFLATION, DISCOUNT_RATE, 5)
+
+@lru_cache(maxsize=32)
+def _annuity_factor(periods):
+    """PV of R1 paid at the end of each year for `periods` years (loan terms repeat)."""
+    return present_value_of_annuity(1.0, DISCOUNT_RATE, periods)
+
+def _fuel_cost_pv(year1_fuel_cost, periods):
+    """PV of fuel cost growing with fuel inflation, using the power tables for whole-year terms."""
+    if isinstance(periods, int) and 0 <= periods < len(_DISC_POW):
+        return _growing_annuity_pv(year1_fuel_cost, FUEL_INFLATION, DISCOUNT_RATE, periods,
+                                   _INFL_POW[periods], _DISC_POW[periods])
+    return present_value_of_growing_annuity(year1_fuel_cost, FUEL_INFLATION, DISCOUNT_RATE, periods)
+
+# Total eBucks rate (R per litre) keyed by (level, has_insurance, has_financing, has_no_bank)
+_TOTAL_RATE = {
+    (level, has_insurance, has_financing, has_no_bank): 0.0 if has_no_bank else (
+        BASE_EBUCKS[level]
+        + (INSURANCE_RATES[level] if has_insurance else 0.0)
+        + (FINANCING_RATES[level] if has_financing else 0.0)
+    )
+    for level in BASE_EBUCKS
+    for has_insurance in (False, True)
+    for has_financing in (False, True)
+    for has_no_bank in (False, True)
+}
 
+# Standard comparison rate: level 4 with insurance & financing
+_STANDARD_TOTAL_RATE = _TOTAL_RATE[(4, True, True, False)]
+
+###############################################################################
+# Calculation Functions
+###############################################################################
 def calculate_standard_upfront_benefits(distance, fuel_type, ebucks_level=4):
     """Calculate standard 5-year upfront benefits for comparison purposes."""
-    consumption_rate = FUEL_CONSUMPTION.get(fuel_type, 9.0)
+    fuel_price, consumption_rate = _FUEL_PARAMS.get(fuel_type, _DEFAULT_FUEL_PARAMS)
     monthly_litres = (consumption_rate * distance) / 100.0
-    fuel_price = FUEL_PRICES.get(fuel_type, 21.62)
-    monthly_fuel_spend = monthly_litres * fuel_price
-    
-    # Get eBucks rates
-    base_rate = BASE_EBUCKS.get(ebucks_level, 0.0)
-    insurance_rate = INSURANCE_RATES.get(ebucks_level, 0.0)
-    financing_rate = FINANCING_RATES.get(ebucks_level, 0.0)
-    total_rate = base_rate + insurance_rate + financing_rate
+    if ebucks_level == 4:
+        total_rate = _STANDARD_TOTAL_RATE
+    else:
+        total_rate = _TOTAL_RATE.get((ebucks_level, True, True, False), 0.0)
+
+    # eBucks on capped fuel spend, then carbon tax on annual tonnes of CO2
+    effective_fuel_spend = min(monthly_litres * fuel_price, MONTHLY_FUEL_SPEND_CAP)
+    pv_ebucks = total_rate * (effective_fuel_spend / fuel_price) * 12 * _EBUCKS_PV_FACTOR_5Y
+    carbon_tax_savings = monthly_litres * _CARBON_TAX_PV_PER_MONTHLY_LITRE
+    upfront_savings = pv_ebucks + carbon_tax_savings
     
-    # Calculate eBucks
+    return {
+        "presentValueEbucks": round(pv_ebucks, 2),
+        "carbonTaxSavings": round(carbon_tax_savings, 2),
+        "upfrontSavings": round(upfront_savings, 2)
+    }
+
+def _monthly_emissions(distance, consumption_rate, has_solar):
+    """Monthly CO2 emissions (kg) of the ICE vehicle and the EV."""
+    monthly_litres = (consumption_rate * distance) / 100.0
+    ice_monthly_emissions = monthly_litres * CO2_PER_LITRE
+    # Always use CO2_SOLAR (0.09) for solar and CO2_GRID (0.9) for grid electricity
+    ev_monthly_emissions = distance * EV_CONSUMPTION * (CO2_SOLAR if has_solar else CO2_GRID)
+    return ice_monthly_emissions, ev_monthly_emissions
+
+def _compute_savings(distance, consumption_rate, fuel_price, total_rate, has_solar, has_no_bank, loan_term_years):
+    """Core per-request calculation on primitive inputs (lookups resolved by the caller).
+
+    Returns (pv_fuel_cost, pv_ev_cost, pv_ebucks, carbon_tax_savings,
+    ice_monthly_emissions, ev_monthly_emissions).
+    """
+    # --- 1. ICE Fuel Consumption & Costs ---
+    monthly_litres = (consumption_rate * distance) / 100.0
+    monthly_fuel_spend = monthly_litres * fuel_price
+
+    # Annual fuel cost for ICE over loan term, applying inflation & discounting
+    year1_fuel_cost = monthly_fuel_spend * 12
+    pv_fuel_cost = _fuel_cost_pv(year1_fuel_cost, loan_term_years)
+
+    # --- 2. EV Charging Costs ---
+    annual_ev_cost = distance * 12 * EV_CONSUMPTION * ESKOM_RATE
+    if has_solar:
+        # With solar, charging cost is 1/10 of normal instead of zero
+        annual_ev_cost *= 0.1  # 10% of normal cost
+    pv_ev_cost = annual_ev_cost * _annuity_factor(loan_term_years)
+
+    # --- 3. eBucks Calculation ---
+    # Cap the fuel spend at R3000 for eBucks calculation
     effective_fuel_spend = min(monthly_fuel_spend, MONTHLY_FUEL_SPEND_CAP)
     qualifying_litres = effective_fuel_spend / fuel_price
     year1_ebucks = total_rate * qualifying_litres * 12
-    
-    # Calculate carbon tax
-    annual_litres = monthly_litres * 12
-    annual_tonnes_co2 = (annual_litres * CO2_PER_LITRE) / 1000.0
+    # Always use 5 years for upfront benefits calculation
+    pv_ebucks = year1_ebucks * _EBUCKS_PV_FACTOR_5Y
+
+    # --- 4. Carbon Tax Savings ---
     carbon_tax_savings = 0.0
-    current_year = 2025
-    for i in range(5):  # Always 5 years for standard
-        year = current_year + i
-        rate = CARBON_TAX.get(year, CARBON_TAX[max(CARBON_TAX.keys())])
-        annual_carbon_cost = annual_tonnes_co2 * rate
-        carbon_tax_savings += present_value(annual_carbon_cost, DISCOUNT_RATE, i+1)
-    
-    # Calculate PV of eBucks
-    pv_ebucks = present_value_of_growing_annuity(year1_ebucks, FUEL_INFLATION, DISCOUNT_RATE, 5)
+    if not has_no_bank:
+        annual_litres = monthly_litres * 12
+        annual_tonnes_co2 = (annual_litres * CO2_PER_LITRE) / 1000.0
+        carbon_tax_savings = annual_tonnes_co2 * _PV_CARBON_FACTOR
+
+    # --- 5. CO2 emissions ---
+    ice_monthly_emissions, ev_monthly_emissions = _monthly_emissions(distance, consumption_rate, has_solar)
+
+    return (pv_fuel_cost, pv_ev_cost, pv_ebucks, carbon_tax_savings,
+            ice_monthly_emissions, ev_monthly_emissions)
+
+def _savings_coefficients(fuel_type, total_rate, has_solar, has_no_bank, loan_term_years):
+    """Per-km coefficients of the PV outputs of _compute_savings, plus the distance
+    at which the monthly fuel spend reaches the eBucks cap.
+
+    Every PV is linear in distance, except eBucks, which stops growing at the cap.
+    Emissions are cheap enough to compute directly and are not included.
+    """
+    fuel_price, consumption_rate = _FUEL_PARAMS[fuel_type]
+    pv_fuel_cost, pv_ev_cost, pv_ebucks, carbon_tax_savings, _, _ = _compute_savings(
+        1.0, consumption_rate, fuel_price, total_rate, has_solar, has_no_bank, loan_term_years)
+    cap_distance = MONTHLY_FUEL_SPEND_CAP / (consumption_rate * fuel_price / 100.0)
+    return (pv_fuel_cost, pv_ev_cost, pv_ebucks, carbon_tax_savings, cap_distance)
+
+# Whole-year loan terms covered by the precomputed coefficient table
+_COEFF_LOAN_TERMS = range(1, 9)
+
+# Coefficients keyed by (level, fuel_type, has_insurance, has_financing, has_solar, has_no_bank, loan_term_years)
+_COEFF = {
+    (level, fuel_type, has_insurance, has_financing, has_solar, has_no_bank, loan_term_years):
+        _savings_coefficients(fuel_type, total_rate, has_solar, has_no_bank, loan_term_years)
+    for (level, has_insurance, has_financing, has_no_bank), total_rate in _TOTAL_RATE.items()
+    for fuel_type in _FUEL_PARAMS
+    for has_solar in (False, True)
+    for loan_term_years in _COEFF_LOAN_TERMS
+}
+
+def _compute_response(level, fuel_type, distance, has_insurance, has_financing, has_solar, has_no_bank, loan_term_years):
+    """Build the /calculate response body for validated inputs."""
+    # --- 1-5. Fuel, EV, eBucks, carbon tax & CO2 ---
+    coefficients = _COEFF.get((level, fuel_type, has_insurance, has_financing, has_solar, has_no_bank, loan_term_years))
+    if coefficients is not None:
+        # Scale the precomputed per-km coefficients; eBucks stop at the spend cap
+        pv_fuel_cost, pv_ev_cost, pv_ebucks, carbon_tax_savings, cap_distance = coefficients
+        pv_fuel_cost *= distance
+        pv_ev_cost *= distance
+        pv_ebucks *= min(distance, cap_distance)
+        carbon_tax_savings *= distance
+
+        # Emissions are not linear-scaled so their rounding matches _compute_savings
+        ice_monthly_emissions, ev_monthly_emissions = _monthly_emissions(
+            distance, _FUEL_PARAMS[fuel_type][1], has_solar)
+    else:
+        # Fractional or long loan terms and unknown levels use the full calculation
+        # Fuel price (R/litre) and consumption (litres per 100 km)
+        fuel_price, consumption_rate = _FUEL_PARAMS.get(fuel_type, _DEFAULT_FUEL_PARAMS)
+        # Banking benefits only apply if hasNoBank is false (handled in _TOTAL_RATE)
+        total_rate = _TOTAL_RATE.get((level, has_insurance, has_financing, has_no_bank), 0.0)
+
+        (pv_fuel_cost, pv_ev_cost, pv_ebucks, carbon_tax_savings,
+         ice_monthly_emissions, ev_monthly_emissions) = _compute_savings(
+            distance, consumption_rate, fuel_price, total_rate,
+            has_solar, has_no_bank, loan_term_years)
+
+    # Fuel Spend Savings: Full fuel cost saved by switching to EV
+    fuel_spend_savings = pv_fuel_cost - pv_ev_cost
+
+    monthly_co2_savings = ice_monthly_emissions - ev_monthly_emissions
+    yearly_co2_savings = monthly_co2_savings * 12
+
+    if app.debug:
+        app.logger.debug("%s EV emissions: %s kg CO2/month", "Solar" if has_solar else "Grid", ev_monthly_emissions)
+        app.logger.debug("Monthly CO2 savings: %s kg", monthly_co2_savings)
+
+    # --- 6. Breakdown of Savings ---
+    # Upfront Savings = PV eBucks + CO₂ emissions savings (from carbon tax)
     upfront_savings = pv_ebucks + carbon_tax_savings
-    
+
+    # Calculate standard upfront benefits for comparison (level 4, 5 years)
+    standard_upfront_benefits = calculate_standard_upfront_benefits(distance, fuel_type)
+
+    # Loan Term Savings = Fuel Spend Savings (i.e. petrol cost avoided)
+    loan_term_savings = fuel_spend_savings
+
+    total_savings = upfront_savings + loan_term_savings
+
     return {
         "presentValueEbucks": round(pv_ebucks, 2),
         "carbonTaxSavings": round(carbon_tax_savings, 2),
-        "upfrontSavings": round(upfront_savings, 2)
+        "fuelSpendSavings": round(loan_term_savings, 2),
+        "upfrontSavings": round(upfront_savings, 2),
+        "totalSavings": round(total_savings, 2),
+        "standardUpfrontBenefits": standard_upfront_benefits,
+        "co2Emissions": {
+            "ice": round(ice_monthly_emissions, 2),
+            "ev": round(ev_monthly_emissions, 2),
+            "monthlySavings": round(monthly_co2_savings, 2),
+            "yearlySavings": round(yearly_co2_savings, 2)
+        }
     }
 
+@lru_cache(maxsize=16384)
+def _compute_response_json(*args):
+    """Serialized _compute_response(*args) body; memoized as immutable bytes
+    since results depend only on the arguments.
+
+    Serialization and _compute_response's debug logging only happen on a miss,
+    so /calculate skips this cache when app.debug is set.
+    """
+    return app.json.response(_compute_response(*args)).get_data()
+
+###############################################################################
+# Request Parsing
+###############################################################################
+# Fields /calculate requires in the request body
+_REQUIRED_FIELDS = ("ebucksLevel", "fuelType", "distance", "hasInsurance", "hasFinancing", "hasSolar")
+
+class CalculationInputError(ValueError):
+    """Raised when a /calculate request body fails validation."""
+
+def _parse_calculate_request(data):
+    """Validate a /calculate request body and return the _compute_response arguments."""
+    if not data:
+        raise CalculationInputError("No data provided")
+
+    missing_fields = [field for field in _REQUIRED_FIELDS if field not in data]
+    if missing_fields:
+        raise CalculationInputError(f"Missing required fields: {', '.join(missing_fields)}")
+
+    fuel_type = data["fuelType"]
+    level = int(data["ebucksLevel"])
+    distance_monthly = float(data["distance"])  # km per month
+    if not math.isfinite(distance_monthly):
+        raise CalculationInputError(f"Invalid distance: {data['distance']}")
+
+    if fuel_type not in FUEL_PRICES:
+        raise CalculationInputError(f"Invalid fuel type: {fuel_type}")
+
+    loan_term_years = data.get("loanTermYears", YEARS)
+    # A negative term counts as zero years, as with the original per-year loop
+    if isinstance(loan_term_years, (int, float)):
+        if not math.isfinite(loan_term_years):
+            raise CalculationInputError(f"Invalid loan term: {loan_term_years}")
+        if loan_term_years < 0:
+            loan_term_years = 0
+
+    return (
+        level,
+        fuel_type,
+        distance_monthly,
+        bool(data["hasInsurance"]),
+        bool(data["hasFinancing"]),
+        bool(data["hasSolar"]),
+        bool(data.get("hasNoBank", False)),
+        loan_term_years,
+    )
+
+# Maximum number of scenarios accepted by /calculate_batch in one request
+MAX_BATCH_SIZE = 10000
+
+# Fields /calculate_batch expands per scenario when given as lists
+_BATCH_FIELDS = _REQUIRED_FIELDS + ("hasNoBank", "loanTermYears")
+
+def _split_batch_request(data):
+    """Expand a /calculate_batch body into one /calculate body per scenario.
+
+    Each request field may be a list (one value per scenario) or a single value
+    that applies to every scenario; all lists must have the same length. Other
+    fields are ignored.
+    """
+    if data is not None and not isinstance(data, dict):
+        raise CalculationInputError("Expected a JSON object")
+    if not data:
+        raise CalculationInputError("No data provided")
+
+    fields = {field: data[field] for field in _BATCH_FIELDS if field in data}
+    lengths = {len(value) for value in fields.values() if isinstance(value, list)}
+    if len(lengths) > 1:
+        raise CalculationInputError("All list fields must have the same length")
+    size = lengths.pop() if lengths else 1
+    if size > MAX_BATCH_SIZE:
+        raise CalculationInputError(f"Batch size {size} exceeds the maximum of {MAX_BATCH_SIZE}")
+
+    return [
+        {field: value[i] if isinstance(value, list) else value for field, value in fields.items()}
+        for i in range(size)
+    ]
+
 ###############################################################################
 # Routes
 ###############################################################################
@@ -154,239 +483,45 @@ def calculate_standard_upfront_benefits(distance, fuel_type, ebucks_level=4):
 def index():
     return render_template("index.html")
 
-@app.route("/calculate", methods=["POST", "OPTIONS"])
+@app.route("/calculate", methods=["POST"])
 def calculate():
-    response_headers = {
-        "Access-Control-Allow-Origin": request.headers.get("Origin", "http://localhost:5173"),
-        "Access-Control-Allow-Methods": "POST, OPTIONS",
-        "Access-Control-Allow-Headers": "Content-Type",
-        "Access-Control-Allow-Credentials": "true"
-    }
-    
-    if request.method == "OPTIONS":
-        return "", 200, response_headers
-        
+    # CORS headers and OPTIONS preflight are handled by Flask-CORS
     try:
         data = request.get_json()
-        if not data:
-            return jsonify({
-                "error": "No data provided",
-                "presentValueEbucks": 0,
-                "carbonTaxSavings": 0,
-                "fuelSpendSavings": 0,
-                "upfrontSavings": 0,
-                "totalSavings": 0,
-                "standardUpfrontBenefits": {
-                    "presentValueEbucks": 0,
-                    "carbonTaxSavings": 0,
-                    "upfrontSavings": 0
-                },
-                "co2Emissions": {
-                    "ice": 0,
-                    "ev": 0,
-                    "monthlySavings": 0,
-                    "yearlySavings": 0
-                }
-            }), 400, response_headers
-
-        # Validate required fields
-        required_fields = ["ebucksLevel", "fuelType", "distance", "hasInsurance", "hasFinancing", "hasSolar"]
-        missing_fields = [field for field in required_fields if field not in data]
-        if missing_fields:
-            return jsonify({
-                "error": f"Missing required fields: {', '.join(missing_fields)}",
-                "presentValueEbucks": 0,
-                "carbonTaxSavings": 0,
-                "fuelSpendSavings": 0,
-                "upfrontSavings": 0,
-                "totalSavings": 0,
-                "standardUpfrontBenefits": {
-                    "presentValueEbucks": 0,
-                    "carbonTaxSavings": 0,
-                    "upfrontSavings": 0
-                },
-                "co2Emissions": {
-                    "ice": 0,
-                    "ev": 0,
-                    "monthlySavings": 0,
-                    "yearlySavings": 0
-                }
-            }), 400, response_headers
-
-        # --- Parse Inputs ---
-        level = int(data["ebucksLevel"])
-        fuel_type = data["fuelType"]
-        distance_monthly = float(data["distance"])  # km per month
-        has_insurance = data["hasInsurance"]
-        has_financing = data["hasFinancing"]
-        has_solar = data["hasSolar"]
-        has_no_bank = data.get("hasNoBank", False)
-        loan_term_years = data.get("loanTermYears", YEARS)
-
-        # Validate fuel type
-        if fuel_type not in FUEL_PRICES:
-            return jsonify({
-                "error": f"Invalid fuel type: {fuel_type}",
-                "presentValueEbucks": 0,
-                "carbonTaxSavings": 0,
-                "fuelSpendSavings": 0,
-                "upfrontSavings": 0,
-                "totalSavings": 0,
-                "standardUpfrontBenefits": {
-                    "presentValueEbucks": 0,
-                    "carbonTaxSavings": 0,
-                    "upfrontSavings": 0
-                },
-                "co2Emissions": {
-                    "ice": 0,
-                    "ev": 0,
-                    "monthlySavings": 0,
-                    "yearlySavings": 0
-                }
-            }), 400, response_headers
-
-        # --- 1. ICE Fuel Consumption & Costs ---
-        consumption_rate = FUEL_CONSUMPTION.get(fuel_type, 9.0)  # litres per 100 km
-        monthly_litres = (consumption_rate * distance_monthly) / 100.0
-        fuel_price = FUEL_PRICES.get(fuel_type, 21.62)
-        monthly_fuel_spend = monthly_litres * fuel_price
-        
-        # Annual fuel cost for ICE over loan term, applying inflation & discounting
-        year1_fuel_cost = monthly_fuel_spend * 12
-        pv_fuel_cost = 0.0
-        for i in range(loan_term_years):
-            cost_year = year1_fuel_cost * ((1 + FUEL_INFLATION) ** i)
-            pv_fuel_cost += present_value(cost_year, DISCOUNT_RATE, i+1)
-
-        # --- 2. EV Charging Costs ---
-        annual_ev_cost = distance_monthly * 12 * EV_CONSUMPTION * ESKOM_RATE
-        # Calculate present value of EV costs
-        if has_solar:
-            # With solar, charging cost is 1/10 of normal instead of zero
-            solar_ev_cost = annual_ev_cost * 0.1  # 10% of normal cost
-            pv_ev_cost = sum(present_value(solar_ev_cost, DISCOUNT_RATE, i+1) for i in range(loan_term_years))
-        else:
-            pv_ev_cost = sum(present_value(annual_ev_cost, DISCOUNT_RATE, i+1) for i in range(loan_term_years))
-
-        # Fuel Spend Savings: Full fuel cost saved by switching to EV
-        fuel_spend_savings = pv_fuel_cost - pv_ev_cost
-
-        # --- 3. eBucks Calculation ---
-        base_rate = 0.0
-        insurance_rate = 0.0
-        financing_rate = 0.0
-        
-        # Only apply banking benefits if hasNoBank is false
-        if not has_no_bank:
-            base_rate = BASE_EBUCKS.get(level, 0.0)
-            insurance_rate = INSURANCE_RATES.get(level, 0.0) if has_insurance else 0.0
-            financing_rate = FINANCING_RATES.get(level, 0.0) if has_financing else 0.0
-        
-        total_rate = base_rate + insurance_rate + financing_rate
-
-        # Cap the fuel spend at R3000 for eBucks calculation
-        effective_fuel_spend = min(monthly_fuel_spend, MONTHLY_FUEL_SPEND_CAP)
-        qualifying_litres = effective_fuel_spend / fuel_price
-        year1_ebucks = total_rate * qualifying_litres * 12
-        # Always use 5 years for upfront benefits calculation
-        pv_ebucks = present_value_of_growing_annuity(year1_ebucks, FUEL_INFLATION, DISCOUNT_RATE, 5)
-
-        # --- 4. Carbon Tax Savings ---
-        carbon_tax_savings = 0.0
-        if not has_no_bank:
-            annual_litres = monthly_litres * 12
-            annual_tonnes_co2 = (annual_litres * CO2_PER_LITRE) / 1000.0
-            current_year = 2025
-            for i in range(5):  # Always 5 years for carbon tax savings
-                year = current_year + i
-                rate = CARBON_TAX.get(year, CARBON_TAX[max(CARBON_TAX.keys())])
-                annual_carbon_cost = annual_tonnes_co2 * rate
-                carbon_tax_savings += present_value(annual_carbon_cost, DISCOUNT_RATE, i+1)
-
-        # --- 5. Calculate CO2 emissions ---
-        ice_monthly_emissions = calculate_monthly_co2(distance_monthly, fuel_type)
-        
-        # EV emissions calculation - CRITICAL FIX
-        # Always use CO2_SOLAR (0.09) for solar and CO2_GRID (0.9) for grid electricity
-        if has_solar:
-            ev_monthly_emissions = distance_monthly * EV_CONSUMPTION * CO2_SOLAR
-            print(f"Solar EV emissions: {ev_monthly_emissions} kg CO2/month")
-        else:
-            ev_monthly_emissions = distance_monthly * EV_CONSUMPTION * CO2_GRID
-            print(f"Grid EV emissions: {ev_monthly_emissions} kg CO2/month")
-            
-        monthly_co2_savings = ice_monthly_emissions - ev_monthly_emissions
-        yearly_co2_savings = monthly_co2_savings * 12
-        
-        print(f"Monthly CO2 savings: {monthly_co2_savings} kg")
-
-        # --- 6. Breakdown of Savings ---
-        # Upfront Savings = PV eBucks + CO₂ emissions savings (from carbon tax)
-        upfront_savings = pv_ebucks + carbon_tax_savings
-
-        # Calculate standard upfront benefits for comparison (level 4, 5 years)
-        standard_upfront_benefits = calculate_standard_upfront_benefits(distance_monthly, fuel_type)
-
-        # Loan Term Savings = Fuel Spend Savings (i.e. petrol cost avoided)
-        loan_term_savings = fuel_spend_savings
-
-        total_savings = upfront_savings + loan_term_savings
-
-        return jsonify({
-            "presentValueEbucks": round(pv_ebucks, 2),
-            "carbonTaxSavings": round(carbon_tax_savings, 2),
-            "fuelSpendSavings": round(loan_term_savings, 2),
-            "upfrontSavings": round(upfront_savings, 2),
-            "totalSavings": round(total_savings, 2),
-            "standardUpfrontBenefits": standard_upfront_benefits,
-            "co2Emissions": {
-                "ice": round(ice_monthly_emissions, 2),
-                "ev": round(ev_monthly_emissions, 2),
-                "monthlySavings": round(monthly_co2_savings, 2),
-                "yearlySavings": round(yearly_co2_savings, 2)
-            }
-        }), 200, response_headers
-
+        args = _parse_calculate_request(data)
+        if app.debug:
+            # Uncached so debug logs and indented output apply to every request
+            return jsonify(_compute_response(*args)), 200
+        body = _compute_response_json(*args)
+        return app.response_class(body, mimetype="application/json"), 200
+
+    except CalculationInputError as e:
+        return jsonify({**_ERROR_TEMPLATE, "error": str(e)}), 400
     except ValueError as e:
-        return jsonify({
-            "error": f"Invalid input value: {str(e)}",
-            "presentValueEbucks": 0,
-            "carbonTaxSavings": 0,
-            "fuelSpendSavings": 0,
-            "upfrontSavings": 0,
-            "totalSavings": 0,
-            "standardUpfrontBenefits": {
-                "presentValueEbucks": 0,
-                "carbonTaxSavings": 0,
-                "upfrontSavings": 0
-            },
-            "co2Emissions": {
-                "ice": 0,
-                "ev": 0,
-                "monthlySavings": 0,
-                "yearlySavings": 0
-            }
-        }), 400, response_headers
+        return jsonify({**_ERROR_TEMPLATE, "error": f"Invalid input value: {str(e)}"}), 400
+    except Exception as e:
+        return jsonify({**_ERROR_TEMPLATE, "error": f"An error occurred: {str(e)}"}), 500
+
+@app.route("/calculate_batch", methods=["POST"])
+def calculate_batch():
+    """Run /calculate for many scenarios at once; returns {"results": [...]} in input order."""
+    try:
+        scenarios = _split_batch_request(request.get_json())
+        results = []
+        for i, scenario in enumerate(scenarios):
+            try:
+                results.append(_compute_response(*_parse_calculate_request(scenario)))
+            except CalculationInputError as e:
+                raise CalculationInputError(f"Scenario {i}: {str(e)}") from e
+            except ValueError as e:
+                raise CalculationInputError(f"Scenario {i}: Invalid input value: {str(e)}") from e
+        return jsonify({"results": results}), 200
+
+    except CalculationInputError as e:
+        return jsonify({"error": str(e), "results": []}), 400
     except Exception as e:
-        return jsonify({
-            "error": f"An error occurred: {str(e)}",
-            "presentValueEbucks": 0,
-            "carbonTaxSavings": 0,
-            "fuelSpendSavings": 0,
-            "upfrontSavings": 0,
-            "totalSavings": 0,
-            "standardUpfrontBenefits": {
-                "presentValueEbucks": 0,
-                "carbonTaxSavings": 0,
-                "upfrontSavings": 0
-            },
-            "co2Emissions": {
-                "ice": 0,
-                "ev": 0,
-                "monthlySavings": 0,
-                "yearlySavings": 0
-            }
-        }), 500, response_headers
+        return jsonify({"error": f"An error occurred: {str(e)}", "results": []}), 500
 
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    # Development server only; in production run `gunicorn app:app` (see gunicorn.conf.py)
+    app.run(debug=os.environ.get("FLASK_DEBUG") == "1")
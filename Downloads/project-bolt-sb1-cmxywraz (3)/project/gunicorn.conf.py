@@ -0,0 +1,12 @@
+# Gunicorn settings for serving app.py in production: `gunicorn app:app`
+import multiprocessing
+
+bind = "127.0.0.1:5000"
+
+# The calculation is pure CPU and GIL-bound, so scale with worker processes
+workers = multiprocessing.cpu_count()
+worker_class = "gthread"
+threads = 2
+
+# Build the module-level lookup tables once, before forking workers
+preload_app = True
@@ -0,0 +1,73 @@
+import unittest
+
+from app import MAX_BATCH_SIZE, app
+
+
+SCENARIO = {
+    "ebucksLevel": 3,
+    "fuelType": "diesel",
+    "distance": 1500,
+    "hasInsurance": True,
+    "hasFinancing": False,
+    "hasSolar": True,
+}
+
+
+class CalculateBatchTest(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def post_batch(self, body):
+        return self.client.post("/calculate_batch", json=body)
+
+    def test_results_match_single_calculations(self):
+        batch = {**SCENARIO, "distance": [100, 1500, 5000], "hasSolar": [True, False, True], "loanTermYears": [3, 5, 7]}
+        response = self.post_batch(batch)
+        self.assertEqual(response.status_code, 200)
+
+        results = response.get_json()["results"]
+        self.assertEqual(len(results), 3)
+        for i, result in enumerate(results):
+            single = {**SCENARIO, "distance": batch["distance"][i], "hasSolar": batch["hasSolar"][i],
+                      "loanTermYears": batch["loanTermYears"][i]}
+            self.assertEqual(result, self.client.post("/calculate", json=single).get_json())
+
+    def test_scalar_fields_give_single_scenario(self):
+        response = self.post_batch(SCENARIO)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["results"], [self.client.post("/calculate", json=SCENARIO).get_json()])
+
+    def test_unknown_list_fields_are_ignored(self):
+        response = self.post_batch({**SCENARIO, "distance": [100, 200], "notes": ["a", "b", "c"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_json()["results"]), 2)
+
+    def test_mismatched_list_lengths(self):
+        response = self.post_batch({**SCENARIO, "distance": [100, 200], "hasSolar": [True]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()["error"], "All list fields must have the same length")
+
+    def test_non_object_body(self):
+        for body in (5, "x", [SCENARIO]):
+            response = self.post_batch(body)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.get_json()["error"], "Expected a JSON object")
+
+    def test_empty_body(self):
+        response = self.post_batch({})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()["error"], "No data provided")
+
+    def test_error_names_failing_scenario(self):
+        response = self.post_batch({**SCENARIO, "fuelType": ["diesel", "lpg"]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json(), {"error": "Scenario 1: Invalid fuel type: lpg", "results": []})
+
+    def test_batch_size_limit(self):
+        response = self.post_batch({**SCENARIO, "distance": [100] * (MAX_BATCH_SIZE + 1)})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("exceeds the maximum", response.get_json()["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()